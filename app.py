@@ -2,11 +2,11 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
-from rag_system import RAGSystem
-from query_processor import QueryProcessor
+from collection_manager import CollectionManager
+from rag_system import collection_paths
 from embedding_generator import EmbeddingGenerator
 from document_processor import DocumentProcessor
-from chunking_strategies import ChunkingStrategies
+from llm_client import get_llm_client
 from config import Config
 
 app = Flask(__name__)
@@ -21,39 +21,63 @@ app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
-rag_system = RAGSystem()
-rag_system.initialize(force_rebuild=False)
-
 embedding_generator = EmbeddingGenerator()
-query_processor = QueryProcessor(embedding_generator, rag_system.vector_store)
+collections = CollectionManager(embedding_generator)
+collections.get(Config.DEFAULT_COLLECTION)
 document_processor = DocumentProcessor()
-chunking_strategies = ChunkingStrategies()
+
+if Config.LLM_WARMUP:
+    get_llm_client().warmup()
+
+if Config.RELOAD_POLL_SECONDS > 0:
+    collections.start_watcher(Config.RELOAD_POLL_SECONDS)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def requested_collection(data=None):
+    if data and data.get('collection'):
+        return collections.validate_name(data.get('collection'))
+    return collections.validate_name(request.args.get('collection') or request.form.get('collection'))
+
 @app.route('/api/health', methods=['GET'])
 def health():
+    rag_system = collections.get(Config.DEFAULT_COLLECTION)
     return jsonify({
         'status': 'OK',
         'initialized': rag_system.initialized,
-        'stats': rag_system.get_stats()
+        'stats': rag_system.get_stats(),
+        'collections': collections.get_stats()
     })
 
+@app.route('/api/collections', methods=['GET'])
+def list_collections():
+    return jsonify({'collections': collections.list_collections()})
+
 @app.route('/api/query', methods=['POST'])
 def query():
+    try:
+        data = request.json
+        name = requested_collection(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not collections.exists(name):
+        return jsonify({'error': f'Collection {name} not found'}), 404
+    
+    rag_system = collections.get(name)
     if not rag_system.initialized:
         return jsonify({'error': 'RAG system not initialized'}), 500
     
     try:
-        data = request.json
         user_query = data.get('query', '')
         use_transformation = data.get('use_transformation', True)
         
         if not user_query:
             return jsonify({'error': 'Query is required'}), 400
         
-        result = query_processor.process_query(user_query, use_transformation)
+        result = rag_system.query_processor.process_query(user_query, use_transformation)
+        result['collection'] = name
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -61,7 +85,15 @@ def query():
 @app.route('/api/rebuild', methods=['POST'])
 def rebuild():
     try:
-        rag_system.initialize(force_rebuild=True)
+        name = requested_collection(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not collections.exists(name):
+        return jsonify({'error': f'Collection {name} not found'}), 404
+    
+    try:
+        rag_system = collections.rebuild(name)
         return jsonify({
             'message': 'Vector store rebuilt successfully',
             'stats': rag_system.get_stats()
@@ -69,12 +101,42 @@ def rebuild():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/reload', methods=['POST'])
+def reload():
+    try:
+        name = requested_collection(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not collections.exists(name):
+        return jsonify({'error': f'Collection {name} not found'}), 404
+    
+    try:
+        rag_system = collections.reload(name)
+        return jsonify({
+            'message': f'Collection {name} reloaded',
+            'stats': rag_system.get_stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/stats', methods=['GET'])
 def stats():
-    return jsonify(rag_system.get_stats())
+    try:
+        name = requested_collection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not collections.exists(name):
+        return jsonify({'error': f'Collection {name} not found'}), 404
+    return jsonify(collections.get(name).get_stats())
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
+    try:
+        rag_system = collections.get(requested_collection())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
     
@@ -84,45 +146,32 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        if not os.path.exists(rag_system.documents_path):
+            os.makedirs(rag_system.documents_path)
+        filepath = os.path.join(rag_system.documents_path, filename)
         file.save(filepath)
         
         try:
-            if filename.endswith('.pdf'):
-                text = document_processor.extract_text_from_pdf(filepath)
-            elif filename.endswith('.txt'):
-                text = document_processor.extract_text_from_txt(filepath)
-            else:
-                return jsonify({'error': 'Unsupported file type'}), 400
+            cleaned_text = document_processor.extract_document_text(filepath)
             
-            if not text or len(text.strip()) < 50:
+            if not cleaned_text or len(cleaned_text) < 50:
                 os.remove(filepath)
                 return jsonify({'error': 'File is empty or too short'}), 400
             
-            cleaned_text = document_processor.clean_text(text)
-            
             doc = {
                 'filename': filename,
                 'content': cleaned_text,
                 'source': filepath
             }
             
-            metadata = {
-                'filename': filename,
-                'source': filepath
-            }
-            
-            chunks = chunking_strategies.apply_all_techniques([doc])
-            
-            chunks_with_embeddings = embedding_generator.generate_chunk_embeddings(chunks)
-            
-            rag_system.vector_store.add_chunks(chunks_with_embeddings)
-            rag_system.vector_store.save()
+            chunks_created = rag_system.add_documents([doc])
+            collections.enforce_budget(keep=rag_system.name)
             
             return jsonify({
                 'message': f'File {filename} uploaded and processed successfully',
                 'filename': filename,
-                'chunks_created': len(chunks),
+                'collection': rag_system.name,
+                'chunks_created': chunks_created,
                 'stats': rag_system.get_stats()
             })
         except Exception as e:
@@ -134,11 +183,17 @@ def upload_file():
 
 @app.route('/api/documents', methods=['GET'])
 def list_documents():
+    try:
+        name = requested_collection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    documents_path, _ = collection_paths(name)
     documents = []
-    if os.path.exists(Config.DOCUMENTS_PATH):
-        for filename in os.listdir(Config.DOCUMENTS_PATH):
+    if os.path.exists(documents_path):
+        for filename in os.listdir(documents_path):
             if filename.endswith(('.pdf', '.txt')):
-                filepath = os.path.join(Config.DOCUMENTS_PATH, filename)
+                filepath = os.path.join(documents_path, filename)
                 size = os.path.getsize(filepath)
                 documents.append({
                     'filename': filename,
@@ -150,15 +205,19 @@ def list_documents():
 @app.route('/api/documents/<filename>', methods=['DELETE'])
 def delete_document(filename):
     try:
-        filepath = os.path.join(Config.DOCUMENTS_PATH, secure_filename(filename))
+        name = requested_collection()
+        documents_path, _ = collection_paths(name)
+        filepath = os.path.join(documents_path, secure_filename(filename))
         if os.path.exists(filepath):
             os.remove(filepath)
-            rag_system.initialize(force_rebuild=True)
+            rag_system = collections.rebuild(name, allow_empty=True)
             return jsonify({
                 'message': f'Document {filename} deleted successfully',
                 'stats': rag_system.get_stats()
             })
         return jsonify({'error': 'File not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,136 @@
+import sys
+from typing import Dict, Optional
+
+ANNOTATION_FIELDS = ('augmented_text', 'header', 'keywords', 'qa_pairs', 'transformed_queries')
+SEQUENCE_FIELDS = ('keywords', 'qa_pairs', 'transformed_queries')
+
+_MISSING = object()
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(tuple(item) if isinstance(item, list) else item for item in value)
+    return value
+
+def _intern_techniques(techniques, technique: Optional[str]) -> tuple:
+    if techniques:
+        return tuple(_intern(name) for name in techniques)
+    return (technique,) if technique else ()
+
+class ChunkRecord:
+    __slots__ = ('text', 'technique', 'filename', 'source', 'chunk_index',
+                 'augmented_text', 'header', 'keywords', 'qa_pairs', 'transformed_queries', 'techniques')
+    
+    def __init__(self, text: str, technique: str = None, filename: str = None, source: str = None,
+                 chunk_index: int = None, augmented_text: str = None, header: str = None,
+                 keywords: tuple = None, qa_pairs: tuple = None, transformed_queries: tuple = None,
+                 techniques: tuple = None):
+        self.text = text
+        self.technique = _intern(technique)
+        self.filename = _intern(filename)
+        self.source = _intern(source)
+        self.chunk_index = chunk_index
+        self.augmented_text = augmented_text
+        self.header = header
+        self.keywords = _freeze(keywords)
+        self.qa_pairs = _freeze(qa_pairs)
+        self.transformed_queries = _freeze(transformed_queries)
+        self.techniques = _intern_techniques(techniques, self.technique)
+    
+    @classmethod
+    def from_dict(cls, chunk: Dict) -> 'ChunkRecord':
+        metadata = chunk.get('metadata', {})
+        return cls(
+            text=chunk['text'],
+            technique=chunk.get('technique'),
+            filename=metadata.get('filename'),
+            source=metadata.get('source'),
+            chunk_index=chunk.get('chunk_index'),
+            augmented_text=chunk.get('augmented_text'),
+            header=chunk.get('header'),
+            keywords=chunk.get('keywords'),
+            qa_pairs=chunk.get('qa_pairs'),
+            transformed_queries=chunk.get('transformed_queries'),
+            techniques=chunk.get('techniques')
+        )
+    
+    @property
+    def embedded_text(self) -> str:
+        return self.augmented_text if self.augmented_text is not None else self.text
+    
+    def merge(self, chunk: Dict):
+        technique = _intern(chunk.get('technique'))
+        if technique and technique not in self.techniques:
+            self.techniques = self.techniques + (technique,)
+        for field in ANNOTATION_FIELDS:
+            if getattr(self, field) is None and chunk.get(field) is not None:
+                value = chunk[field]
+                setattr(self, field, _freeze(value) if field in SEQUENCE_FIELDS else value)
+    
+    def get(self, key: str, default=None):
+        if key == 'metadata':
+            return {'filename': self.filename, 'source': self.source}
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+    
+    def __getitem__(self, key: str):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+    
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+    
+    def __setstate__(self, state):
+        state = tuple(state) + (None,) * (len(self.__slots__) - len(state))
+        for field, value in zip(self.__slots__, state):
+            setattr(self, field, value)
+        self.technique = _intern(self.technique)
+        self.techniques = _intern_techniques(self.techniques, self.technique)
+        self.filename = _intern(self.filename)
+        self.source = _intern(self.source)
+    
+    def to_dict(self) -> Dict:
+        chunk = {'metadata': self.get('metadata')}
+        for field in self.__slots__:
+            if field not in ('filename', 'source') and getattr(self, field) is not None:
+                chunk[field] = getattr(self, field)
+        return chunk
+    
+    def nbytes(self) -> int:
+        total = sys.getsizeof(self) + len(self.text)
+        if self.augmented_text is not None:
+            total += len(self.augmented_text)
+        if self.header is not None:
+            total += len(self.header)
+        return total
+
+class SearchResult:
+    __slots__ = ('record', 'similarity_score', 'distance')
+    
+    def __init__(self, record: ChunkRecord, distance: float):
+        self.record = record
+        self.distance = distance
+        self.similarity_score = 1 / (1 + distance)
+    
+    def get(self, key: str, default=None):
+        if key == 'similarity_score':
+            return self.similarity_score
+        if key == 'distance':
+            return self.distance
+        return self.record.get(key, default)
+    
+    def __getitem__(self, key: str):
+        return self.get(key) if key in ('similarity_score', 'distance') else self.record[key]
+    
+    def to_dict(self) -> Dict:
+        chunk = self.record.to_dict()
+        chunk['similarity_score'] = self.similarity_score
+        chunk['distance'] = self.distance
+        return chunk
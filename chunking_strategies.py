@@ -1,74 +1,116 @@
 import re
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
 from config import Config
-
-try:
-    from openai import OpenAI
-    openai_client = OpenAI(api_key=Config.OPENAI_API_KEY) if Config.OPENAI_API_KEY and Config.LLM_PROVIDER == 'openai' else None
-except:
-    openai_client = None
-
-try:
-    import ollama
-    ollama_available = True
-except:
-    ollama_available = False
+from llm_client import get_llm_client
 
 class ChunkingStrategies:
-    def __init__(self):
+    def __init__(self, embedding_generator=None):
+        self.embedding_generator = embedding_generator
         self.chunk_size = Config.CHUNK_SIZE
-        self.chunk_overlap = Config.CHUNK_OVERLAP
-        
+        if embedding_generator is not None:
+            self.chunk_size = min(self.chunk_size, embedding_generator.max_input_tokens)
+        self.chunk_overlap = max(0, min(Config.CHUNK_OVERLAP, self.chunk_size - 1))
+        max_input_tokens = embedding_generator.max_input_tokens if embedding_generator is not None else self.chunk_size
+        qa_token_budget = min(Config.QA_TOKEN_BUDGET, max_input_tokens // 2)
+        self.qa_chunk_size = max(1, min(self.chunk_size, max_input_tokens - qa_token_budget))
+    
+    def _token_spans(self, text: str) -> List[Tuple[int, int]]:
+        if self.embedding_generator is not None:
+            return self.embedding_generator.token_spans(text)
+        return [match.span() for match in re.finditer(r'\S+', text)]
+    
+    def _count_tokens(self, text: str) -> int:
+        if self.embedding_generator is not None:
+            return self.embedding_generator.count_tokens(text)
+        return len(text.split())
+    
+    def _split_by_tokens(self, text: str, chunk_size: int = None) -> List[Tuple[str, int]]:
+        chunk_size = chunk_size or self.chunk_size
+        spans = self._token_spans(text)
+        step = max(1, chunk_size - min(self.chunk_overlap, chunk_size - 1))
+        pieces = []
+        
+        for i in range(0, len(spans), step):
+            window = spans[i:i + chunk_size]
+            piece = text[window[0][0]:window[-1][1]]
+            if piece.strip():
+                pieces.append((piece, len(window)))
+            if i + chunk_size >= len(spans):
+                break
+        
+        return pieces
+    
     def technique1_fixed_size_chunking(self, text: str, metadata: Dict) -> List[Dict]:
         chunks = []
-        words = text.split()
         
-        for i in range(0, len(words), self.chunk_size - self.chunk_overlap):
-            chunk_text = ' '.join(words[i:i + self.chunk_size])
-            if chunk_text.strip():
-                chunks.append({
-                    'text': chunk_text,
-                    'technique': 'fixed_size',
-                    'metadata': metadata,
-                    'chunk_index': len(chunks)
-                })
+        for chunk_text, token_count in self._split_by_tokens(text):
+            chunks.append({
+                'text': chunk_text,
+                'technique': 'fixed_size',
+                'metadata': metadata,
+                'chunk_index': len(chunks),
+                'token_count': token_count
+            })
         
         return chunks
     
-    def technique2_semantic_chunking(self, text: str, metadata: Dict) -> List[Dict]:
+    def technique2_semantic_chunking(self, text: str, metadata: Dict, chunk_size: int = None) -> List[Dict]:
+        chunk_size = chunk_size or self.chunk_size
         chunks = []
         paragraphs = text.split('\n\n')
         current_chunk = ""
+        current_tokens = 0
+        
+        def flush():
+            if current_chunk:
+                chunks.append({
+                    'text': current_chunk.strip(),
+                    'technique': 'semantic',
+                    'metadata': metadata,
+                    'chunk_index': len(chunks),
+                    'token_count': current_tokens
+                })
         
         for para in paragraphs:
             para = para.strip()
             if not para:
                 continue
             
-            if len(current_chunk) + len(para) < self.chunk_size:
-                current_chunk += para + "\n\n"
-            else:
-                if current_chunk:
+            para_tokens = self._count_tokens(para)
+            
+            if para_tokens > chunk_size:
+                flush()
+                current_chunk = ""
+                current_tokens = 0
+                for piece, token_count in self._split_by_tokens(para, chunk_size):
                     chunks.append({
-                        'text': current_chunk.strip(),
+                        'text': piece.strip(),
                         'technique': 'semantic',
                         'metadata': metadata,
-                        'chunk_index': len(chunks)
+                        'chunk_index': len(chunks),
+                        'token_count': token_count
                     })
+            elif current_tokens + para_tokens <= chunk_size:
+                current_chunk += para + "\n\n"
+                current_tokens += para_tokens
+            else:
+                flush()
                 current_chunk = para + "\n\n"
+                current_tokens = para_tokens
         
-        if current_chunk:
-            chunks.append({
-                'text': current_chunk.strip(),
-                'technique': 'semantic',
-                'metadata': metadata,
-                'chunk_index': len(chunks)
-            })
+        flush()
         
         return chunks
     
-    def technique3_contextual_headers(self, text: str, metadata: Dict) -> List[Dict]:
-        chunks = self.technique2_semantic_chunking(text, metadata)
+    def _derive_chunks(self, text: str, metadata: Dict, technique: str, base_chunks: List[Dict] = None,
+                       chunk_size: int = None) -> List[Dict]:
+        if base_chunks is None:
+            base_chunks = self.technique2_semantic_chunking(text, metadata, chunk_size)
+        return [dict(chunk, technique=technique) for chunk in base_chunks]
+    
+    def technique3_contextual_headers(self, text: str, metadata: Dict, base_chunks: List[Dict] = None) -> List[Dict]:
+        chunks = self._derive_chunks(text, metadata, 'contextual_headers', base_chunks)
         
         for chunk in chunks:
             sentences = chunk['text'].split('.')
@@ -81,81 +123,56 @@ class ChunkingStrategies:
         
         return chunks
     
-    def technique4_synthetic_qa(self, text: str, metadata: Dict) -> List[Dict]:
-        chunks = self.technique2_semantic_chunking(text, metadata)
+    def technique4_synthetic_qa(self, text: str, metadata: Dict, base_chunks: List[Dict] = None) -> List[Dict]:
+        chunks = self._derive_chunks(text, metadata, 'synthetic_qa', base_chunks, self.qa_chunk_size)
         
         for chunk in chunks:
             qa_pairs = self._generate_qa_pairs(chunk['text'])
             chunk['qa_pairs'] = qa_pairs
             qa_text = "\n".join([f"Q: {q}\nA: {a}" for q, a in qa_pairs])
-            chunk['augmented_text'] = chunk['text'] + "\n\n" + qa_text
+            augmented_text = chunk['text'] + "\n\n" + qa_text
+            spans = self._token_spans(augmented_text)
+            chunk['token_count'] = len(spans)
+            if self.embedding_generator is not None and len(spans) > self.embedding_generator.max_input_tokens:
+                augmented_text = augmented_text[:spans[self.embedding_generator.max_input_tokens - 1][1]]
+            chunk['augmented_text'] = augmented_text
         
         return chunks
     
     def _generate_qa_pairs(self, text: str) -> List[tuple]:
+        llm = get_llm_client()
+        if not llm.available:
+            return []
+        
         try:
-            import ollama
-            use_ollama = True
-        except:
-            use_ollama = False
-        
-        if use_ollama and Config.LLM_PROVIDER == 'ollama':
-            try:
-                prompt = f"""Generate 2-3 question-answer pairs based on this text. Format as Q: question\nA: answer\n\nText: {text[:500]}"""
-                
-                response = ollama.chat(
-                    model=Config.LLM_MODEL,
-                    messages=[{'role': 'user', 'content': prompt}],
-                    options={'temperature': 0.3, 'num_predict': 200}
-                )
-                
-                qa_text = response['message']['content']
-                qa_pairs = []
-                lines = qa_text.split('\n')
-                current_q = None
-                
-                for line in lines:
-                    if line.startswith('Q:'):
-                        current_q = line[2:].strip()
-                    elif line.startswith('A:') and current_q:
-                        qa_pairs.append((current_q, line[2:].strip()))
-                        current_q = None
-                
-                return qa_pairs[:3]
-            except Exception as e:
-                print(f"Error generating QA pairs with Ollama: {e}")
-                return []
-        
-        if openai_client and Config.OPENAI_API_KEY and Config.LLM_PROVIDER == 'openai':
-            try:
-                prompt = f"""Generate 2-3 question-answer pairs based on this text. Format as Q: question\nA: answer\n\nText: {text[:500]}"""
-                
-                response = openai_client.chat.completions.create(
-                    model='gpt-3.5-turbo',
-                    messages=[{'role': 'user', 'content': prompt}],
-                    temperature=0.3,
-                    max_tokens=200
-                )
-                
-                qa_text = response.choices[0].message.content
-                qa_pairs = []
-                lines = qa_text.split('\n')
-                current_q = None
-                
-                for line in lines:
-                    if line.startswith('Q:'):
-                        current_q = line[2:].strip()
-                    elif line.startswith('A:') and current_q:
-                        qa_pairs.append((current_q, line[2:].strip()))
-                        current_q = None
-                
-                return qa_pairs[:3]
-            except Exception as e:
-                print(f"Error generating QA pairs: {e}")
-                return []
+            prompt = f"""Generate 2-3 question-answer pairs based on this text. Format as Q: question\nA: answer\n\nText: {text[:500]}"""
+            
+            response = llm.chat(
+                [{'role': 'user', 'content': prompt}],
+                temperature=0.3,
+                max_tokens=200,
+                openai_model='gpt-3.5-turbo'
+            )
+            
+            qa_text = response['content']
+            qa_pairs = []
+            lines = qa_text.split('\n')
+            current_q = None
+            
+            for line in lines:
+                if line.startswith('Q:'):
+                    current_q = line[2:].strip()
+                elif line.startswith('A:') and current_q:
+                    qa_pairs.append((current_q, line[2:].strip()))
+                    current_q = None
+            
+            return qa_pairs[:3]
+        except Exception as e:
+            print(f"Error generating QA pairs with {llm.provider}: {e}")
+            return []
     
-    def technique5_query_transformation(self, text: str, metadata: Dict) -> List[Dict]:
-        chunks = self.technique2_semantic_chunking(text, metadata)
+    def technique5_query_transformation(self, text: str, metadata: Dict, base_chunks: List[Dict] = None) -> List[Dict]:
+        chunks = self._derive_chunks(text, metadata, 'query_transformation', base_chunks)
         
         for chunk in chunks:
             keywords = self._extract_keywords(chunk['text'])
@@ -180,27 +197,34 @@ class ChunkingStrategies:
                 variations.append(sent.strip()[:100])
         return variations[:3]
     
-    def apply_all_techniques(self, documents: List[Dict]) -> List[Dict]:
+    def chunk_document(self, doc: Dict) -> List[Dict]:
+        text = doc['content']
+        metadata = {
+            'filename': doc['filename'],
+            'source': doc['source']
+        }
+        
+        semantic_chunks = self.technique2_semantic_chunking(text, metadata)
+        qa_base_chunks = semantic_chunks if self.qa_chunk_size == self.chunk_size else None
+        
+        chunks = []
+        chunks.extend(self.technique1_fixed_size_chunking(text, metadata))
+        chunks.extend(semantic_chunks)
+        chunks.extend(self.technique3_contextual_headers(text, metadata, semantic_chunks))
+        chunks.extend(self.technique4_synthetic_qa(text, metadata, qa_base_chunks))
+        chunks.extend(self.technique5_query_transformation(text, metadata, semantic_chunks))
+        return chunks
+    
+    def apply_all_techniques(self, documents: List[Dict], workers: int = None) -> List[Dict]:
         all_chunks = []
         
-        for doc in documents:
-            text = doc['content']
-            metadata = {
-                'filename': doc['filename'],
-                'source': doc['source']
-            }
-            
-            chunks_1 = self.technique1_fixed_size_chunking(text, metadata)
-            chunks_2 = self.technique2_semantic_chunking(text, metadata)
-            chunks_3 = self.technique3_contextual_headers(text, metadata)
-            chunks_4 = self.technique4_synthetic_qa(text, metadata)
-            chunks_5 = self.technique5_query_transformation(text, metadata)
-            
-            all_chunks.extend(chunks_1)
-            all_chunks.extend(chunks_2)
-            all_chunks.extend(chunks_3)
-            all_chunks.extend(chunks_4)
-            all_chunks.extend(chunks_5)
+        if workers and workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self.chunk_document, documents))
+        else:
+            results = [self.chunk_document(doc) for doc in documents]
+        
+        for chunks in results:
+            all_chunks.extend(chunks)
         
         return all_chunks
-
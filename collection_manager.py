@@ -0,0 +1,145 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict
+from embedding_generator import EmbeddingGenerator
+from rag_system import RAGSystem, collection_paths
+from index_builder import build_collection
+from vector_store import read_current_build
+from config import Config
+
+COLLECTION_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+class CollectionManager:
+    def __init__(self, embedding_generator: EmbeddingGenerator = None, memory_budget_mb: int = None):
+        self.embedding_generator = embedding_generator or EmbeddingGenerator()
+        if memory_budget_mb is None:
+            memory_budget_mb = Config.COLLECTION_MEMORY_BUDGET_MB
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.collections = OrderedDict()
+        self.lock = threading.Lock()
+        self.loading_locks = {}
+    
+    def validate_name(self, name: str) -> str:
+        name = name or Config.DEFAULT_COLLECTION
+        if not COLLECTION_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid collection name: {name}")
+        return name
+    
+    def exists(self, name: str) -> bool:
+        name = self.validate_name(name)
+        if name == Config.DEFAULT_COLLECTION:
+            return True
+        return os.path.isdir(os.path.join(Config.COLLECTIONS_PATH, name))
+    
+    def get(self, name: str = None) -> RAGSystem:
+        name = self.validate_name(name)
+        
+        with self.lock:
+            if name in self.collections:
+                self.collections.move_to_end(name)
+                return self.collections[name]
+            loading_lock = self.loading_locks.setdefault(name, threading.Lock())
+        
+        with loading_lock:
+            with self.lock:
+                if name in self.collections:
+                    self.collections.move_to_end(name)
+                    return self.collections[name]
+            
+            print(f"Loading collection: {name}")
+            rag_system = RAGSystem(name, self.embedding_generator)
+            rag_system.initialize(force_rebuild=False)
+            
+            with self.lock:
+                self.collections[name] = rag_system
+                self.loading_locks.pop(name, None)
+                self._evict(keep=name)
+        
+        return rag_system
+    
+    def swap(self, rag_system: RAGSystem):
+        with self.lock:
+            previous = self.collections.get(rag_system.name)
+            self.collections[rag_system.name] = rag_system
+            self.collections.move_to_end(rag_system.name)
+            self._evict(keep=rag_system.name)
+        if previous is not None and previous is not rag_system:
+            previous.release()
+    
+    def reload(self, name: str = None) -> RAGSystem:
+        name = self.validate_name(name)
+        rag_system = RAGSystem(name, self.embedding_generator)
+        if not rag_system.load():
+            rag_system.release()
+            raise RuntimeError(f"No published build found for collection '{name}'")
+        self.swap(rag_system)
+        print(f"Reloaded collection {name} from build {rag_system.vector_store.build}")
+        return rag_system
+    
+    def rebuild(self, name: str = None, allow_empty: bool = False) -> RAGSystem:
+        rag_system = build_collection(self.validate_name(name), self.embedding_generator, allow_empty=allow_empty)
+        self.swap(rag_system)
+        return rag_system
+    
+    def start_watcher(self, interval: float):
+        def watch():
+            while True:
+                time.sleep(interval)
+                with self.lock:
+                    loaded = list(self.collections.items())
+                for name, rag_system in loaded:
+                    _, store_path = collection_paths(name)
+                    build = read_current_build(store_path)
+                    if build and build != rag_system.vector_store.build:
+                        try:
+                            self.reload(name)
+                        except Exception as e:
+                            print(f"Could not reload collection {name}: {e}")
+        
+        threading.Thread(target=watch, daemon=True).start()
+    
+    def enforce_budget(self, keep: str = None):
+        with self.lock:
+            self._evict(keep=keep)
+    
+    def _evict(self, keep: str = None):
+        usage = sum(rag_system.memory_usage() for rag_system in self.collections.values())
+        
+        for name in list(self.collections.keys()):
+            if usage <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            evicted = self.collections.pop(name)
+            evicted.release()
+            usage -= evicted.memory_usage()
+            print(f"Evicted collection: {name}")
+    
+    def list_collections(self) -> List[Dict]:
+        names = {Config.DEFAULT_COLLECTION}
+        if os.path.exists(Config.COLLECTIONS_PATH):
+            for entry in os.listdir(Config.COLLECTIONS_PATH):
+                if COLLECTION_NAME_PATTERN.match(entry) and os.path.isdir(os.path.join(Config.COLLECTIONS_PATH, entry)):
+                    names.add(entry)
+        
+        with self.lock:
+            loaded = {name: rag_system.memory_usage() for name, rag_system in self.collections.items()}
+        
+        return [{
+            'name': name,
+            'loaded': name in loaded,
+            'memory_bytes': loaded.get(name, 0)
+        } for name in sorted(names)]
+    
+    def get_stats(self) -> Dict:
+        with self.lock:
+            usage = sum(rag_system.memory_usage() for rag_system in self.collections.values())
+            loaded = list(self.collections.keys())
+        return {
+            'loaded_collections': loaded,
+            'memory_bytes': usage,
+            'memory_budget_bytes': self.memory_budget
+        }
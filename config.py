@@ -7,12 +7,38 @@ class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
     EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
     LLM_MODEL = os.getenv('LLM_MODEL', 'llama3')
+    OPENAI_LLM_MODEL = os.getenv('OPENAI_LLM_MODEL', os.getenv('LLM_MODEL', 'gpt-3.5-turbo'))
     LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'ollama')
+    OLLAMA_HOST = os.getenv('OLLAMA_HOST', '')
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', '')
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 120))
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+    LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 10))
+    LLM_POOL_KEEPALIVE_SECONDS = float(os.getenv('LLM_POOL_KEEPALIVE_SECONDS', 300))
+    LLM_KEEP_ALIVE = os.getenv('LLM_KEEP_ALIVE', '30m')
+    LLM_WARMUP = os.getenv('LLM_WARMUP', 'true').lower() == 'true'
     VECTOR_DB_PATH = os.getenv('VECTOR_DB_PATH', './vector_store')
     DOCUMENTS_PATH = os.getenv('DOCUMENTS_PATH', './documents')
+    SEGMENT_COMPACTION_THRESHOLD = int(os.getenv('SEGMENT_COMPACTION_THRESHOLD', 8))
+    KEEP_BUILDS = int(os.getenv('KEEP_BUILDS', 3))
+    RELOAD_POLL_SECONDS = float(os.getenv('RELOAD_POLL_SECONDS', 0))
+    PDF_BACKEND = os.getenv('PDF_BACKEND', 'auto')
+    PDF_MIN_PAGE_CHARS = int(os.getenv('PDF_MIN_PAGE_CHARS', 20))
+    EXTRACTION_CACHE_PATH = os.getenv('EXTRACTION_CACHE_PATH', './extraction_cache')
+    COLLECTIONS_PATH = os.getenv('COLLECTIONS_PATH', './collections')
+    DEFAULT_COLLECTION = os.getenv('DEFAULT_COLLECTION', 'default')
+    COLLECTION_MEMORY_BUDGET_MB = int(os.getenv('COLLECTION_MEMORY_BUDGET_MB', 1024))
     CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', 500))
     CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', 50))
+    QA_TOKEN_BUDGET = int(os.getenv('QA_TOKEN_BUDGET', 96))
     TOP_K = int(os.getenv('TOP_K', 3))
     USE_LOCAL_EMBEDDINGS = os.getenv('USE_LOCAL_EMBEDDINGS', 'true').lower() == 'true'
+    SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+    SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', 512))
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.92))
+    QUERY_BATCH_ENABLED = os.getenv('QUERY_BATCH_ENABLED', 'true').lower() == 'true'
+    QUERY_BATCH_MAX_SIZE = int(os.getenv('QUERY_BATCH_MAX_SIZE', 32))
+    QUERY_BATCH_MAX_WAIT_MS = float(os.getenv('QUERY_BATCH_MAX_WAIT_MS', 5))
+    QUERY_BATCH_TIMEOUT = float(os.getenv('QUERY_BATCH_TIMEOUT', 30))
     USE_LOCAL_LLM = os.getenv('USE_LOCAL_LLM', 'true').lower() == 'true'
 
@@ -1,27 +1,80 @@
 import os
+import hashlib
 import pdfplumber
 import pypdf
 import re
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional
 from config import Config
 
+PDF_BACKENDS = ('auto', 'pypdf', 'pdfplumber')
+EXTRACTION_VERSION = 2
+LAYOUT_MAX_AVG_WORD_LENGTH = 20
+
 class DocumentProcessor:
-    def __init__(self):
-        self.documents_path = Config.DOCUMENTS_PATH
+    def __init__(self, documents_path: str = None, pdf_backend: str = None):
+        self.documents_path = documents_path or Config.DOCUMENTS_PATH
+        self.pdf_backend = pdf_backend or Config.PDF_BACKEND
+        if self.pdf_backend not in PDF_BACKENDS:
+            raise ValueError(f"Unknown PDF backend: {self.pdf_backend}")
+        self.cache_path = Config.EXTRACTION_CACHE_PATH
         
-    def extract_text_from_pdf(self, file_path: str) -> str:
+    def extract_text_from_pdf(self, file_path: str, backend: str = None) -> str:
+        backend = backend or self.pdf_backend
         try:
-            text = ""
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            return text
+            if backend == 'pdfplumber':
+                return self._extract_with_pdfplumber(file_path)
+            return self._extract_with_pypdf(file_path, fallback=backend == 'auto')
+        except Exception as e:
+            if backend != 'auto':
+                print(f"Error extracting text from PDF: {e}")
+                return ""
+            print(f"pypdf failed on {file_path} ({e}), retrying with pdfplumber")
+        
+        try:
+            return self._extract_with_pdfplumber(file_path)
         except Exception as e:
             print(f"Error extracting text from PDF: {e}")
             return ""
     
+    def _extract_with_pdfplumber(self, file_path: str) -> str:
+        text = ""
+        with pdfplumber.open(file_path) as pdf:
+            for page in pdf.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    text += page_text + "\n"
+        return text
+    
+    def _needs_layout_extraction(self, page_text: str) -> bool:
+        words = page_text.split()
+        if len(page_text.strip()) < Config.PDF_MIN_PAGE_CHARS or not words:
+            return True
+        return sum(len(word) for word in words) / len(words) > LAYOUT_MAX_AVG_WORD_LENGTH
+    
+    def _extract_with_pypdf(self, file_path: str, fallback: bool = True) -> str:
+        reader = pypdf.PdfReader(file_path)
+        pages = []
+        fallback_pages = []
+        
+        for i, page in enumerate(reader.pages):
+            try:
+                page_text = page.extract_text() or ""
+            except Exception:
+                page_text = ""
+            if fallback and self._needs_layout_extraction(page_text):
+                fallback_pages.append(i)
+            pages.append(page_text)
+        
+        if fallback_pages:
+            with pdfplumber.open(file_path) as pdf:
+                for i in fallback_pages:
+                    page_text = pdf.pages[i].extract_text()
+                    if page_text:
+                        pages[i] = page_text
+        
+        return "".join(page_text + "\n" for page_text in pages if page_text)
+    
     def extract_text_from_txt(self, file_path: str) -> str:
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -38,29 +91,84 @@ class DocumentProcessor:
         text = re.sub(r'\d+/\d+', '', text)
         return text.strip()
     
-    def load_documents(self) -> List[Dict[str, str]]:
+    def _cache_file(self, file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        file_hash = digest.hexdigest()
+        settings = self.pdf_backend
+        if self.pdf_backend == 'auto':
+            settings += f'-p{Config.PDF_MIN_PAGE_CHARS}-w{LAYOUT_MAX_AVG_WORD_LENGTH}'
+        return os.path.join(self.cache_path, file_hash[:2], f'{file_hash}-{settings}-v{EXTRACTION_VERSION}.txt')
+    
+    def extract_document_text(self, file_path: str) -> str:
+        if file_path.endswith('.txt'):
+            text = self.extract_text_from_txt(file_path)
+            return self.clean_text(text) if text else ""
+        
+        if not file_path.endswith('.pdf'):
+            return ""
+        
+        cache_file = None
+        if self.cache_path:
+            try:
+                cache_file = self._cache_file(file_path)
+                if os.path.exists(cache_file):
+                    with open(cache_file, 'r', encoding='utf-8') as f:
+                        return f.read()
+            except Exception as e:
+                print(f"Error reading extraction cache: {e}")
+        
+        text = self.extract_text_from_pdf(file_path)
+        if not text:
+            return ""
+        cleaned_text = self.clean_text(text)
+        
+        if cache_file:
+            try:
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    f.write(cleaned_text)
+                os.replace(tmp_file, cache_file)
+            except Exception as e:
+                print(f"Error writing extraction cache: {e}")
+        
+        return cleaned_text
+    
+    def load_document(self, filename: str) -> Optional[Dict[str, str]]:
+        if not filename.endswith(('.pdf', '.txt')):
+            return None
+        
+        file_path = os.path.join(self.documents_path, filename)
+        content = self.extract_document_text(file_path)
+        if not content:
+            return None
+        
+        return {
+            'filename': filename,
+            'content': content,
+            'source': file_path
+        }
+    
+    def load_documents(self, workers: int = None) -> List[Dict[str, str]]:
         documents = []
         if not os.path.exists(self.documents_path):
             os.makedirs(self.documents_path)
             print(f"Created documents directory: {self.documents_path}")
             return documents
         
-        for filename in os.listdir(self.documents_path):
-            file_path = os.path.join(self.documents_path, filename)
-            if filename.endswith('.pdf'):
-                text = self.extract_text_from_pdf(file_path)
-            elif filename.endswith('.txt'):
-                text = self.extract_text_from_txt(file_path)
-            else:
-                continue
-            
-            if text:
-                cleaned_text = self.clean_text(text)
-                documents.append({
-                    'filename': filename,
-                    'content': cleaned_text,
-                    'source': file_path
-                })
+        filenames = sorted(os.listdir(self.documents_path))
+        
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                loaded = list(executor.map(self.load_document, filenames))
+        else:
+            loaded = [self.load_document(filename) for filename in filenames]
+        
+        for doc in loaded:
+            if doc:
+                documents.append(doc)
         
         return documents
-
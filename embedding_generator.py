@@ -1,6 +1,7 @@
 import os
+import re
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from sentence_transformers import SentenceTransformer
 from config import Config
 
@@ -10,6 +11,32 @@ try:
 except:
     openai_client = None
 
+try:
+    import tiktoken
+    tiktoken_available = True
+except:
+    tiktoken_available = False
+
+OPENAI_EMBEDDING_MODEL = 'text-embedding-ada-002'
+OPENAI_EMBEDDING_MAX_TOKENS = 8191
+
+def merge_truncation_reports(base: Dict, update: Dict) -> Dict:
+    merged = {technique: dict(stats) for technique, stats in base.items()}
+    for technique, stats in update.items():
+        totals = merged.setdefault(technique, {
+            'chunks': 0,
+            'truncated_chunks': 0,
+            'tokens': 0,
+            'tokens_lost': 0
+        })
+        for key in ('chunks', 'truncated_chunks', 'tokens', 'tokens_lost'):
+            totals[key] += stats[key]
+    
+    for stats in merged.values():
+        stats['loss_ratio'] = round(stats['tokens_lost'] / stats['tokens'], 4) if stats['tokens'] else 0.0
+    
+    return merged
+
 class EmbeddingGenerator:
     def __init__(self):
         self.use_local = Config.USE_LOCAL_EMBEDDINGS
@@ -18,10 +45,78 @@ class EmbeddingGenerator:
         if self.use_local:
             print(f"Loading local embedding model: {self.model_name}")
             self.model = SentenceTransformer(self.model_name)
+            self.tokenizer = self.model.tokenizer
+            self.encoding = None
+            special_tokens = self.tokenizer.num_special_tokens_to_add(pair=False)
+            self.max_input_tokens = self.model.max_seq_length - special_tokens
         else:
             self.model = None
             if not openai_client:
                 raise ValueError("OpenAI API key required for cloud embeddings")
+            if not tiktoken_available:
+                raise ValueError("tiktoken required to measure chunk sizes for cloud embeddings")
+            self.tokenizer = None
+            self.encoding = tiktoken.encoding_for_model(OPENAI_EMBEDDING_MODEL)
+            self.max_input_tokens = OPENAI_EMBEDDING_MAX_TOKENS
+    
+    def _tokenize(self, text: str) -> List:
+        if self.tokenizer is not None:
+            return self.tokenizer.tokenize(text)
+        return self.encoding.encode(text)
+    
+    def _word_token_spans(self, text: str) -> List[Tuple[int, int]]:
+        spans = []
+        for match in re.finditer(r'\S+', text):
+            start, end = match.span()
+            count = max(1, len(self._tokenize(text[start:end])))
+            bounds = [start + (end - start) * i // count for i in range(count)] + [end]
+            spans.extend(zip(bounds[:-1], bounds[1:]))
+        return spans
+    
+    def token_spans(self, text: str) -> List[Tuple[int, int]]:
+        if self.tokenizer is not None and getattr(self.tokenizer, 'is_fast', False):
+            encoded = self.tokenizer(
+                text,
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                truncation=False,
+                verbose=False
+            )
+            return [tuple(span) for span in encoded['offset_mapping']]
+        
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text)
+            decoded, starts = self.encoding.decode_with_offsets(tokens)
+            if decoded == text:
+                ends = starts[1:] + [len(text)]
+                return list(zip(starts, ends))
+        
+        return self._word_token_spans(text)
+    
+    def count_tokens(self, text: str) -> int:
+        return len(self.token_spans(text))
+    
+    def truncation_report(self, chunks: List[Dict]) -> Dict:
+        report = {}
+        for chunk in chunks:
+            tokens = chunk.get('token_count')
+            if tokens is None:
+                tokens = self.count_tokens(chunk.get('augmented_text', chunk['text']))
+            lost = max(0, tokens - self.max_input_tokens)
+            
+            stats = report.setdefault(chunk.get('technique', 'unknown'), {
+                'chunks': 0,
+                'truncated_chunks': 0,
+                'tokens': 0,
+                'tokens_lost': 0
+            })
+            stats['chunks'] += 1
+            stats['tokens'] += tokens
+            stats['tokens_lost'] += lost
+            if lost:
+                stats['truncated_chunks'] += 1
+        
+        return merge_truncation_reports({}, report)
     
     def generate_embedding(self, text: str) -> np.ndarray:
         if self.use_local:
@@ -29,7 +124,7 @@ class EmbeddingGenerator:
         else:
             try:
                 response = openai_client.embeddings.create(
-                    model='text-embedding-ada-002',
+                    model=OPENAI_EMBEDDING_MODEL,
                     input=text
                 )
                 return np.array(response.data[0].embedding)
@@ -37,9 +132,9 @@ class EmbeddingGenerator:
                 print(f"Error generating embedding: {e}")
                 raise
     
-    def generate_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+    def generate_embeddings_batch(self, texts: List[str], show_progress_bar: bool = True) -> np.ndarray:
         if self.use_local:
-            return self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
+            return self.model.encode(texts, convert_to_numpy=True, show_progress_bar=show_progress_bar)
         else:
             embeddings = []
             for text in texts:
@@ -55,10 +150,12 @@ class EmbeddingGenerator:
             else:
                 texts.append(chunk['text'])
         
-        embeddings = self.generate_embeddings_batch(texts)
+        unique_texts = list(dict.fromkeys(texts))
+        positions = {text: i for i, text in enumerate(unique_texts)}
+        embeddings = self.generate_embeddings_batch(unique_texts)
         
         for i, chunk in enumerate(chunks):
-            chunk['embedding'] = embeddings[i]
+            chunk['embedding'] = embeddings[positions[texts[i]]]
         
         return chunks
 
@@ -0,0 +1,57 @@
+import argparse
+import os
+import shutil
+from embedding_generator import EmbeddingGenerator
+from rag_system import RAGSystem, collection_root
+from vector_store import new_build_id
+from config import Config
+
+try:
+    import torch
+    torch_available = True
+except:
+    torch_available = False
+
+def build_collection(name: str = None, embedding_generator: EmbeddingGenerator = None, workers: int = None,
+                     allow_empty: bool = False) -> RAGSystem:
+    root = collection_root(name or Config.DEFAULT_COLLECTION)
+    new_collection = root is not None and not os.path.isdir(root)
+    rag_system = None
+    
+    try:
+        rag_system = RAGSystem(name, embedding_generator, build=new_build_id())
+        print(f"Building collection '{rag_system.name}' as build {rag_system.vector_store.build}")
+        rag_system.build_from_documents(workers)
+        
+        if not rag_system.initialized and allow_empty:
+            rag_system.vector_store.save()
+        elif not rag_system.initialized:
+            raise RuntimeError(f"No documents found for collection '{rag_system.name}'")
+    except Exception:
+        if rag_system is not None:
+            rag_system.release()
+        if new_collection:
+            shutil.rmtree(root, ignore_errors=True)
+        elif rag_system is not None:
+            shutil.rmtree(rag_system.vector_store.data_path, ignore_errors=True)
+        raise
+    
+    rag_system.vector_store.publish()
+    print(f"Published build {rag_system.vector_store.build}")
+    return rag_system
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a versioned vector store outside the server process.')
+    parser.add_argument('--collection', default=Config.DEFAULT_COLLECTION, help='Collection to build')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes/threads to use')
+    args = parser.parse_args()
+    
+    if torch_available:
+        torch.set_num_threads(args.workers)
+    
+    rag_system = build_collection(args.collection, workers=args.workers)
+    rag_system.release()
+    print("Run POST /api/reload on the server to switch to this build.")
+
+if __name__ == '__main__':
+    main()
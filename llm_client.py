@@ -0,0 +1,128 @@
+import threading
+from typing import List, Dict, Optional
+from config import Config
+
+try:
+    import httpx
+    httpx_available = True
+except:
+    httpx_available = False
+
+try:
+    from openai import OpenAI
+    openai_available = True
+except:
+    openai_available = False
+
+try:
+    import ollama
+    ollama_available = True
+except:
+    ollama_available = False
+
+class LLMClient:
+    def __init__(self):
+        self.provider = None
+        self.ollama_client = None
+        self.openai_client = None
+        self.timeout = Config.LLM_TIMEOUT
+        self.keep_alive = Config.LLM_KEEP_ALIVE
+        self.semaphore = threading.BoundedSemaphore(Config.LLM_MAX_CONCURRENCY)
+        
+        limits = None
+        if httpx_available:
+            limits = httpx.Limits(
+                max_connections=Config.LLM_POOL_SIZE,
+                max_keepalive_connections=Config.LLM_POOL_SIZE,
+                keepalive_expiry=Config.LLM_POOL_KEEPALIVE_SECONDS
+            )
+        
+        if Config.LLM_PROVIDER == 'ollama' and ollama_available:
+            kwargs = {'limits': limits} if limits is not None else {}
+            self.ollama_client = ollama.Client(host=Config.OLLAMA_HOST or None, timeout=self.timeout, **kwargs)
+            self.provider = 'ollama'
+        elif Config.LLM_PROVIDER == 'openai' and openai_available and Config.OPENAI_API_KEY:
+            kwargs = {}
+            if limits is not None:
+                kwargs['http_client'] = httpx.Client(limits=limits, timeout=self.timeout)
+            self.openai_client = OpenAI(
+                api_key=Config.OPENAI_API_KEY,
+                base_url=Config.OPENAI_BASE_URL or None,
+                timeout=self.timeout,
+                **kwargs
+            )
+            self.provider = 'openai'
+    
+    @property
+    def model(self) -> str:
+        return Config.OPENAI_LLM_MODEL if self.provider == 'openai' else Config.LLM_MODEL
+    
+    @property
+    def available(self) -> bool:
+        return self.provider is not None
+    
+    def chat(self, messages: List[Dict], temperature: float, max_tokens: int, openai_model: Optional[str] = None) -> Dict:
+        if not self.available:
+            raise RuntimeError("No LLM provider available")
+        
+        if not self.semaphore.acquire(timeout=self.timeout):
+            raise TimeoutError("Timed out waiting for a free LLM slot")
+        
+        try:
+            if self.provider == 'ollama':
+                response = self.ollama_client.chat(
+                    model=self.model,
+                    messages=messages,
+                    options={'temperature': temperature, 'num_predict': max_tokens},
+                    keep_alive=self.keep_alive
+                )
+                prompt_tokens = response.get('prompt_eval_count', 0)
+                completion_tokens = response.get('eval_count', 0)
+                return {
+                    'content': response['message']['content'],
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': completion_tokens,
+                    'total_tokens': prompt_tokens + completion_tokens
+                }
+            
+            response = self.openai_client.chat.completions.create(
+                model=openai_model or self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=self.timeout
+            )
+            usage = response.usage
+            return {
+                'content': response.choices[0].message.content,
+                'prompt_tokens': usage.prompt_tokens,
+                'completion_tokens': usage.completion_tokens,
+                'total_tokens': usage.total_tokens
+            }
+        finally:
+            self.semaphore.release()
+    
+    def warmup(self) -> bool:
+        if not self.available:
+            return False
+        
+        try:
+            if self.provider == 'ollama':
+                self.ollama_client.generate(model=self.model, prompt='', keep_alive=self.keep_alive)
+            else:
+                self.openai_client.models.retrieve(self.model)
+            print(f"Warmed up {self.provider} model: {self.model}")
+            return True
+        except Exception as e:
+            print(f"LLM warmup failed: {e}")
+            return False
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import List, Tuple
+import numpy as np
+from config import Config
+
+class QueryBatcher:
+    def __init__(self, embedding_generator, max_batch_size: int = None, max_wait_ms: float = None, timeout: float = None):
+        self.embedding_generator = weakref.ref(embedding_generator, lambda _: self.queue.put(None))
+        self.max_batch_size = max_batch_size or Config.QUERY_BATCH_MAX_SIZE
+        if max_wait_ms is None:
+            max_wait_ms = Config.QUERY_BATCH_MAX_WAIT_MS
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout or Config.QUERY_BATCH_TIMEOUT
+        self.queue = queue.Queue()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.closed = False
+        self.batches = 0
+        self.requests = 0
+        self.shared = 0
+        
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def embed(self, text: str) -> np.ndarray:
+        return self._submit((text, None, None)).result(timeout=self.timeout)
+    
+    def embed_and_search(self, text: str, vector_store, top_k: int = None) -> Tuple[np.ndarray, List]:
+        return self._submit((text, vector_store, top_k)).result(timeout=self.timeout)
+    
+    def _submit(self, key) -> Future:
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Embedding generator is no longer available")
+            self.requests += 1
+            future = self.pending.get(key)
+            if future is not None:
+                self.shared += 1
+                return future
+            future = Future()
+            self.pending[key] = future
+            self.queue.put((key, future))
+        return future
+    
+    def _shutdown(self):
+        error = RuntimeError("Embedding generator is no longer available")
+        with self.lock:
+            self.closed = True
+            self.pending = {}
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[1].set_exception(error)
+    
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self._shutdown()
+                return
+            batch = [item]
+            
+            try:
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self.queue.put(None)
+                        break
+                    batch.append(item)
+                
+                self._process(batch)
+            except Exception as e:
+                print(f"Query batch error: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                with self.lock:
+                    for key, future in batch:
+                        if self.pending.get(key) is future:
+                            del self.pending[key]
+    
+    def _process(self, batch):
+        self.batches += 1
+        texts = list(dict.fromkeys(key[0] for key, _ in batch))
+        positions = {text: i for i, text in enumerate(texts)}
+        
+        embedding_generator = self.embedding_generator()
+        if embedding_generator is None:
+            raise RuntimeError("Embedding generator is no longer available")
+        
+        try:
+            embeddings = embedding_generator.generate_embeddings_batch(texts, show_progress_bar=False)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        
+        searches = {}
+        for key, future in batch:
+            text, vector_store, top_k = key
+            embedding = embeddings[positions[text]]
+            if vector_store is None:
+                future.set_result(embedding)
+            else:
+                searches.setdefault((vector_store, top_k), []).append((future, embedding))
+        
+        for (vector_store, top_k), jobs in searches.items():
+            try:
+                results = vector_store.search_batch(np.vstack([embedding for _, embedding in jobs]), top_k)
+                for (future, embedding), result in zip(jobs, results):
+                    future.set_result((embedding, result))
+            except Exception as e:
+                for future, _ in jobs:
+                    future.set_exception(e)
+    
+    def get_stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'shared': self.shared,
+                'batches': self.batches,
+                'average_batch_size': round((self.requests - self.shared) / self.batches, 2) if self.batches else 0.0
+            }
+
+_batchers = weakref.WeakKeyDictionary()
+_batchers_lock = threading.Lock()
+
+def get_query_batcher(embedding_generator) -> QueryBatcher:
+    with _batchers_lock:
+        batcher = _batchers.get(embedding_generator)
+        if batcher is None:
+            batcher = QueryBatcher(embedding_generator)
+            _batchers[embedding_generator] = batcher
+        return batcher
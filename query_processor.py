@@ -1,71 +1,70 @@
 from typing import List, Dict
 from embedding_generator import EmbeddingGenerator
 from vector_store import VectorStore
+from semantic_cache import SemanticCache
+from llm_client import get_llm_client
+from query_batcher import get_query_batcher
 from config import Config
 
-try:
-    from openai import OpenAI
-    openai_client = OpenAI(api_key=Config.OPENAI_API_KEY) if Config.OPENAI_API_KEY and Config.LLM_PROVIDER == 'openai' else None
-except:
-    openai_client = None
-
-try:
-    import ollama
-    ollama_available = True
-except:
-    ollama_available = False
-
 class QueryProcessor:
     def __init__(self, embedding_generator: EmbeddingGenerator, vector_store: VectorStore):
         self.embedding_generator = embedding_generator
         self.vector_store = vector_store
         self.use_local_llm = Config.USE_LOCAL_LLM
+        self.llm = get_llm_client()
+        self.cache = SemanticCache() if Config.SEMANTIC_CACHE_ENABLED else None
+        self.batcher = get_query_batcher(embedding_generator) if Config.QUERY_BATCH_ENABLED else None
     
     def transform_query(self, query: str) -> str:
-        if Config.LLM_PROVIDER == 'ollama' and ollama_available:
-            try:
-                prompt = f"""Rewrite this query to improve retrieval from a document corpus. Keep the core meaning but make it more specific and searchable.
-
-Original query: {query}
-Rewritten query:"""
-                
-                response = ollama.chat(
-                    model=Config.LLM_MODEL,
-                    messages=[{'role': 'user', 'content': prompt}],
-                    options={'temperature': 0.3, 'num_predict': 100}
-                )
-                
-                transformed = response['message']['content'].strip()
-                return transformed if transformed else query
-            except Exception as e:
-                print(f"Query transformation error: {e}")
-                return query
-        elif openai_client and Config.OPENAI_API_KEY:
-            try:
-                prompt = f"""Rewrite this query to improve retrieval from a document corpus. Keep the core meaning but make it more specific and searchable.
+        if not self.llm.available:
+            return query
+        
+        try:
+            prompt = f"""Rewrite this query to improve retrieval from a document corpus. Keep the core meaning but make it more specific and searchable.
 
 Original query: {query}
 Rewritten query:"""
-                
-                response = openai_client.chat.completions.create(
-                    model='gpt-3.5-turbo',
-                    messages=[{'role': 'user', 'content': prompt}],
-                    temperature=0.3,
-                    max_tokens=100
-                )
-                
-                transformed = response.choices[0].message.content.strip()
-                return transformed if transformed else query
-            except Exception as e:
-                print(f"Query transformation error: {e}")
-                return query
-        else:
+            
+            response = self.llm.chat(
+                [{'role': 'user', 'content': prompt}],
+                temperature=0.3,
+                max_tokens=100,
+                openai_model='gpt-3.5-turbo'
+            )
+            
+            transformed = response['content'].strip()
+            return transformed if transformed else query
+        except Exception as e:
+            print(f"Query transformation error: {e}")
             return query
     
     def retrieve_context(self, query_embedding, top_k: int = None) -> List[Dict]:
         results = self.vector_store.search(query_embedding, top_k)
         return results
     
+    def embed_query(self, query: str):
+        if self.batcher is not None:
+            return self.batcher.embed(query)
+        return self.embedding_generator.generate_embedding(query)
+    
+    def search_query(self, query: str, top_k: int = None):
+        if self.batcher is not None:
+            return self.batcher.embed_and_search(query, self.vector_store, top_k)
+        query_embedding = self.embedding_generator.generate_embedding(query)
+        return query_embedding, self.retrieve_context(query_embedding, top_k)
+    
+    def _sources(self, context_chunks: List[Dict]) -> List[Dict]:
+        sources = []
+        for chunk in context_chunks:
+            techniques = list(chunk.get('techniques', ())) or [chunk.get('technique', 'unknown')]
+            sources.append({
+                'filename': chunk.get('metadata', {}).get('filename', 'unknown'),
+                'similarity': chunk.get('similarity_score', 0),
+                'technique': ', '.join(techniques),
+                'techniques': techniques
+            })
+        return sources
+    
     def generate_response(self, query: str, context_chunks: List[Dict]) -> Dict:
         context_text = "\n\n".join([
             f"[Source: {chunk.get('metadata', {}).get('filename', 'unknown')}]\n{chunk.get('text', '')}"
@@ -90,51 +89,10 @@ Answer based only on the context provided:"""
                 'chunks_retrieved': 0
             }
         
-        if Config.LLM_PROVIDER == 'ollama' and ollama_available:
-            try:
-                response = ollama.chat(
-                    model=Config.LLM_MODEL,
-                    messages=[
-                        {'role': 'system', 'content': system_prompt},
-                        {'role': 'user', 'content': user_prompt}
-                    ],
-                    options={'temperature': 0.3, 'num_predict': 500}
-                )
-                
-                answer = response['message']['content']
-                
-                sources = []
-                for chunk in context_chunks:
-                    source_info = {
-                        'filename': chunk.get('metadata', {}).get('filename', 'unknown'),
-                        'similarity': chunk.get('similarity_score', 0),
-                        'technique': chunk.get('technique', 'unknown')
-                    }
-                    sources.append(source_info)
-                
-                return {
-                    'answer': answer,
-                    'sources': sources,
-                    'tokens_used': {
-                        'prompt_tokens': response.get('prompt_eval_count', 0),
-                        'completion_tokens': response.get('eval_count', 0),
-                        'total_tokens': response.get('prompt_eval_count', 0) + response.get('eval_count', 0)
-                    },
-                    'chunks_retrieved': len(context_chunks)
-                }
-            except Exception as e:
-                print(f"Ollama error: {e}")
-                return {
-                    'answer': f"Error generating response: {str(e)}. Make sure Ollama is running and model is installed.",
-                    'sources': [],
-                    'tokens_used': {},
-                    'chunks_retrieved': 0
-                }
-        elif openai_client and Config.LLM_PROVIDER == 'openai':
+        if self.llm.available:
             try:
-                response = openai_client.chat.completions.create(
-                    model=Config.LLM_MODEL,
-                    messages=[
+                response = self.llm.chat(
+                    [
                         {'role': 'system', 'content': system_prompt},
                         {'role': 'user', 'content': user_prompt}
                     ],
@@ -142,31 +100,24 @@ Answer based only on the context provided:"""
                     max_tokens=500
                 )
                 
-                answer = response.choices[0].message.content
-                usage = response.usage
-                
-                sources = []
-                for chunk in context_chunks:
-                    source_info = {
-                        'filename': chunk.get('metadata', {}).get('filename', 'unknown'),
-                        'similarity': chunk.get('similarity_score', 0),
-                        'technique': chunk.get('technique', 'unknown')
-                    }
-                    sources.append(source_info)
-                
                 return {
-                    'answer': answer,
-                    'sources': sources,
+                    'answer': response['content'],
+                    'sources': self._sources(context_chunks),
                     'tokens_used': {
-                        'prompt_tokens': usage.prompt_tokens,
-                        'completion_tokens': usage.completion_tokens,
-                        'total_tokens': usage.total_tokens
+                        'prompt_tokens': response['prompt_tokens'],
+                        'completion_tokens': response['completion_tokens'],
+                        'total_tokens': response['total_tokens']
                     },
                     'chunks_retrieved': len(context_chunks)
                 }
             except Exception as e:
+                if self.llm.provider == 'ollama':
+                    print(f"Ollama error: {e}")
+                    message = f"Error generating response: {str(e)}. Make sure Ollama is running and model is installed."
+                else:
+                    message = f"Error generating response: {str(e)}"
                 return {
-                    'answer': f"Error generating response: {str(e)}",
+                    'answer': message,
                     'sources': [],
                     'tokens_used': {},
                     'chunks_retrieved': 0
@@ -180,11 +131,7 @@ Answer based only on the context provided:"""
             
             return {
                 'answer': '\n\n'.join(answer_parts),
-                'sources': [{
-                    'filename': chunk.get('metadata', {}).get('filename', 'unknown'),
-                    'similarity': chunk.get('similarity_score', 0),
-                    'technique': chunk.get('technique', 'unknown')
-                } for chunk in context_chunks],
+                'sources': self._sources(context_chunks),
                 'tokens_used': {
                     'prompt_tokens': 0,
                     'completion_tokens': 0,
@@ -194,14 +141,47 @@ Answer based only on the context provided:"""
             }
     
     def process_query(self, query: str, use_transformation: bool = True) -> Dict:
-        transformed_query = self.transform_query(query) if use_transformation else query
+        query_embedding = None
+        context_chunks = None
+        version = self.vector_store.version
+        
+        if not use_transformation:
+            query_embedding, context_chunks = self.search_query(query)
+        elif self.cache is not None:
+            query_embedding = self.embed_query(query)
+        
+        if self.cache is not None:
+            cached = self.cache.lookup(query_embedding, version, key=use_transformation)
+            if cached is not None:
+                cached['cache_hit'] = True
+                cached['transformed_query'] = query
+                cached['tokens_used'] = {
+                    'prompt_tokens': 0,
+                    'completion_tokens': 0,
+                    'total_tokens': 0
+                }
+                return cached
         
-        query_embedding = self.embedding_generator.generate_embedding(transformed_query)
+        transformed_query = self.transform_query(query) if use_transformation else query
         
-        context_chunks = self.retrieve_context(query_embedding)
+        if context_chunks is None:
+            if query_embedding is not None and transformed_query == query:
+                context_chunks = self.retrieve_context(query_embedding)
+            else:
+                _, context_chunks = self.search_query(transformed_query)
         
         response = self.generate_response(query, context_chunks)
         response['transformed_query'] = transformed_query if use_transformation else query
         
+        if self.cache is not None and response['sources']:
+            self.cache.store(query_embedding, version, dict(response), key=use_transformation)
+        
+        response['cache_hit'] = False
         return response
+    
+    def get_cache_stats(self) -> Dict:
+        return self.cache.get_stats() if self.cache is not None else {}
+    
+    def get_batch_stats(self) -> Dict:
+        return self.batcher.get_stats() if self.batcher is not None else {}
 
@@ -1,50 +1,108 @@
 import os
 from document_processor import DocumentProcessor
 from chunking_strategies import ChunkingStrategies
-from embedding_generator import EmbeddingGenerator
+from embedding_generator import EmbeddingGenerator, merge_truncation_reports
 from vector_store import VectorStore
+from query_processor import QueryProcessor
 from config import Config
 
+def collection_root(name: str):
+    if name == Config.DEFAULT_COLLECTION:
+        return None
+    return os.path.join(Config.COLLECTIONS_PATH, name)
+
+def collection_paths(name: str):
+    root = collection_root(name)
+    if root is None:
+        return Config.DOCUMENTS_PATH, Config.VECTOR_DB_PATH
+    return os.path.join(root, 'documents'), os.path.join(root, 'vector_store')
+
 class RAGSystem:
-    def __init__(self):
-        self.document_processor = DocumentProcessor()
-        self.chunking_strategies = ChunkingStrategies()
-        self.embedding_generator = EmbeddingGenerator()
-        self.vector_store = VectorStore()
+    def __init__(self, name: str = None, embedding_generator: EmbeddingGenerator = None, build: str = None):
+        self.name = name or Config.DEFAULT_COLLECTION
+        self.documents_path, store_path = collection_paths(self.name)
+        self.document_processor = DocumentProcessor(self.documents_path)
+        self.embedding_generator = embedding_generator or EmbeddingGenerator()
+        self.chunking_strategies = ChunkingStrategies(self.embedding_generator)
+        self.vector_store = VectorStore(store_path, build)
+        self.query_processor = QueryProcessor(self.embedding_generator, self.vector_store)
+        self.truncation_report = {}
         self.initialized = False
     
+    def load(self) -> bool:
+        self.vector_store.load()
+        self.truncation_report = self.vector_store.read_metadata('truncation_report')
+        self.initialized = len(self.vector_store.chunks) > 0
+        return self.initialized
+    
     def initialize(self, force_rebuild: bool = False):
         if not force_rebuild:
             try:
-                self.vector_store.load()
-                if len(self.vector_store.chunks) > 0:
-                    self.initialized = True
+                if self.load():
                     print("Loaded existing vector store")
                     return
             except Exception as e:
                 print(f"Could not load existing store: {e}")
         
+        self.build_from_documents()
+    
+    def build_from_documents(self, workers: int = None):
         print("Building vector store from documents...")
-        documents = self.document_processor.load_documents()
+        self.vector_store.reset()
+        self.initialized = False
+        self.truncation_report = {}
+        documents = self.document_processor.load_documents(workers)
         
         if not documents:
             print("No documents found. Please add PDF or TXT files to the documents/ directory.")
             return
         
         print(f"Processing {len(documents)} documents...")
-        chunks = self.chunking_strategies.apply_all_techniques(documents)
+        chunks = self.chunking_strategies.apply_all_techniques(documents, workers)
         print(f"Generated {len(chunks)} chunks using 5 RAG techniques")
         
+        self.truncation_report = self.embedding_generator.truncation_report(chunks)
+        self.print_truncation_report()
+        
         print("Generating embeddings...")
         chunks_with_embeddings = self.embedding_generator.generate_chunk_embeddings(chunks)
         
         print("Indexing vectors...")
         self.vector_store.add_chunks(chunks_with_embeddings)
         self.vector_store.save()
+        self.vector_store.write_metadata('truncation_report', self.truncation_report)
         
         self.initialized = True
         print(f"Vector store initialized with {len(self.vector_store.chunks)} chunks")
     
+    def add_documents(self, documents):
+        chunks = self.chunking_strategies.apply_all_techniques(documents)
+        report = self.embedding_generator.truncation_report(chunks)
+        chunks_with_embeddings = self.embedding_generator.generate_chunk_embeddings(chunks)
+        added = self.vector_store.add_chunks(chunks_with_embeddings)
+        self.vector_store.save()
+        self.truncation_report = merge_truncation_reports(self.truncation_report, report)
+        self.vector_store.write_metadata('truncation_report', self.truncation_report)
+        self.initialized = len(self.vector_store.chunks) > 0
+        return added
+    
+    def release(self):
+        self.vector_store.release()
+    
+    def memory_usage(self) -> int:
+        return self.vector_store.memory_usage()
+    
+    def print_truncation_report(self):
+        print(f"Embedding window: {self.embedding_generator.max_input_tokens} tokens, chunk size: {self.chunking_strategies.chunk_size} tokens")
+        for technique, stats in self.truncation_report.items():
+            print(f"  {technique}: {stats['truncated_chunks']}/{stats['chunks']} chunks truncated, "
+                  f"{stats['tokens_lost']}/{stats['tokens']} tokens lost ({stats['loss_ratio']:.1%})")
+    
     def get_stats(self):
-        return self.vector_store.get_stats()
+        stats = self.vector_store.get_stats()
+        stats['collection'] = self.name
+        stats['truncation'] = self.truncation_report
+        stats['semantic_cache'] = self.query_processor.get_cache_stats()
+        stats['query_batching'] = self.query_processor.get_batch_stats()
+        return stats
 
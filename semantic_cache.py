@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+import faiss
+from config import Config
+
+class SemanticCache:
+    def __init__(self, max_entries: int = None, threshold: float = None):
+        self.max_entries = max_entries if max_entries is not None else Config.SEMANTIC_CACHE_SIZE
+        self.threshold = threshold if threshold is not None else Config.SEMANTIC_CACHE_THRESHOLD
+        self.index = None
+        self.entries = OrderedDict()
+        self.version = None
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+    
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        vector = embedding.reshape(1, -1).astype('float32')
+        faiss.normalize_L2(vector)
+        return vector
+    
+    def _reset(self, dimension: int, version):
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        self.entries.clear()
+        self.version = version
+    
+    def lookup(self, embedding: np.ndarray, version, key=None) -> Optional[Dict]:
+        vector = self._normalize(embedding)
+        
+        with self.lock:
+            if self.index is None or self.version != version or self.index.ntotal == 0:
+                self.misses += 1
+                return None
+            
+            scores, ids = self.index.search(vector, min(4, self.index.ntotal))
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    break
+                entry = self.entries.get(int(entry_id))
+                if entry and entry['key'] == key:
+                    self.entries.move_to_end(int(entry_id))
+                    self.hits += 1
+                    return dict(entry['response'], cache_similarity=float(score))
+            
+            self.misses += 1
+            return None
+    
+    def store(self, embedding: np.ndarray, version, response: Dict, key=None):
+        if self.max_entries <= 0:
+            return
+        
+        vector = self._normalize(embedding)
+        
+        with self.lock:
+            if self.index is None or self.version != version or self.index.d != vector.shape[1]:
+                self._reset(vector.shape[1], version)
+            
+            while len(self.entries) >= self.max_entries:
+                evicted_id, _ = self.entries.popitem(last=False)
+                self.index.remove_ids(np.array([evicted_id], dtype='int64'))
+                self.evictions += 1
+            
+            entry_id = self.next_id
+            self.next_id += 1
+            self.index.add_with_ids(vector, np.array([entry_id], dtype='int64'))
+            self.entries[entry_id] = {'key': key, 'response': response}
+    
+    def clear(self):
+        with self.lock:
+            self.index = None
+            self.entries.clear()
+            self.version = None
+    
+    def get_stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
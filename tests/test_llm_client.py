@@ -0,0 +1,196 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+import llm_client
+from config import Config
+
+
+class MockLLMServer:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+    
+    def _handler(self):
+        mock = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def log_message(self, *args):
+                pass
+            
+            def _reply(self, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_GET(self):
+                mock.requests.append((self.path, None))
+                self._reply({'id': self.path.rsplit('/', 1)[-1], 'object': 'model', 'created': 0, 'owned_by': 'mock'})
+            
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                
+                with mock.lock:
+                    mock.requests.append((self.path, body))
+                    mock.in_flight += 1
+                    mock.max_in_flight = max(mock.max_in_flight, mock.in_flight)
+                try:
+                    time.sleep(mock.delay)
+                finally:
+                    with mock.lock:
+                        mock.in_flight -= 1
+                
+                if self.path == '/api/chat':
+                    self._reply({
+                        'model': body.get('model'),
+                        'message': {'role': 'assistant', 'content': 'mock answer'},
+                        'done': True,
+                        'prompt_eval_count': 3,
+                        'eval_count': 2
+                    })
+                elif self.path == '/api/generate':
+                    self._reply({'model': body.get('model'), 'response': '', 'done': True})
+                else:
+                    self._reply({
+                        'id': 'chatcmpl-mock',
+                        'object': 'chat.completion',
+                        'created': 0,
+                        'model': body.get('model'),
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': 'mock answer'},
+                            'finish_reason': 'stop'
+                        }],
+                        'usage': {'prompt_tokens': 3, 'completion_tokens': 2, 'total_tokens': 5}
+                    })
+        
+        return Handler
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_client(monkeypatch, provider: str, url: str, **settings) -> llm_client.LLMClient:
+    monkeypatch.setattr(Config, 'LLM_PROVIDER', provider)
+    monkeypatch.setattr(Config, 'OLLAMA_HOST', url)
+    monkeypatch.setattr(Config, 'OPENAI_BASE_URL', f'{url}/v1')
+    monkeypatch.setattr(Config, 'OPENAI_API_KEY', 'test-key')
+    for name, value in settings.items():
+        monkeypatch.setattr(Config, name, value)
+    return llm_client.LLMClient()
+
+
+def test_ollama_chat_passes_keep_alive(monkeypatch):
+    pytest.importorskip('ollama')
+    with MockLLMServer() as server:
+        client = make_client(monkeypatch, 'ollama', server.url, LLM_KEEP_ALIVE='7m')
+        
+        response = client.chat([{'role': 'user', 'content': 'hi'}], temperature=0.3, max_tokens=10)
+        
+        assert response['content'] == 'mock answer'
+        assert response['total_tokens'] == 5
+        path, body = server.requests[-1]
+        assert path == '/api/chat'
+        assert body['keep_alive'] == '7m'
+        assert body['options']['num_predict'] == 10
+
+
+def test_ollama_warmup_loads_model_with_keep_alive(monkeypatch):
+    pytest.importorskip('ollama')
+    with MockLLMServer() as server:
+        client = make_client(monkeypatch, 'ollama', server.url, LLM_KEEP_ALIVE='7m', LLM_MODEL='mock-model')
+        
+        assert client.warmup()
+        path, body = server.requests[-1]
+        assert path == '/api/generate'
+        assert body['model'] == 'mock-model'
+        assert body['keep_alive'] == '7m'
+
+
+def test_ollama_call_times_out(monkeypatch):
+    pytest.importorskip('ollama')
+    with MockLLMServer(delay=1.0) as server:
+        client = make_client(monkeypatch, 'ollama', server.url, LLM_TIMEOUT=0.2)
+        
+        started = time.monotonic()
+        with pytest.raises(httpx.TimeoutException):
+            client.chat([{'role': 'user', 'content': 'hi'}], temperature=0.3, max_tokens=10)
+        assert time.monotonic() - started < 0.6
+
+
+def test_waiting_for_a_free_slot_times_out(monkeypatch):
+    pytest.importorskip('ollama')
+    with MockLLMServer(delay=1.0) as server:
+        client = make_client(monkeypatch, 'ollama', server.url, LLM_TIMEOUT=5, LLM_MAX_CONCURRENCY=1)
+        busy = threading.Thread(target=client.chat, args=([{'role': 'user', 'content': 'hi'}],),
+                                kwargs={'temperature': 0.3, 'max_tokens': 10})
+        busy.start()
+        time.sleep(0.1)
+        client.timeout = 0.2
+        
+        started = time.monotonic()
+        with pytest.raises(TimeoutError, match='free LLM slot'):
+            client.chat([{'role': 'user', 'content': 'hi'}], temperature=0.3, max_tokens=10)
+        assert time.monotonic() - started < 0.6
+        busy.join()
+
+
+def test_concurrency_is_limited(monkeypatch):
+    pytest.importorskip('ollama')
+    with MockLLMServer(delay=0.1) as server:
+        client = make_client(monkeypatch, 'ollama', server.url, LLM_MAX_CONCURRENCY=2)
+        
+        threads = [
+            threading.Thread(target=client.chat, args=([{'role': 'user', 'content': 'hi'}],),
+                             kwargs={'temperature': 0.3, 'max_tokens': 10})
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(server.requests) == 6
+        assert server.max_in_flight == 2
+
+
+def test_openai_chat_and_warmup_use_configured_model(monkeypatch):
+    pytest.importorskip('openai')
+    with MockLLMServer() as server:
+        client = make_client(monkeypatch, 'openai', server.url, OPENAI_LLM_MODEL='mock-gpt')
+        
+        assert client.warmup()
+        assert server.requests[-1][0] == '/v1/models/mock-gpt'
+        
+        response = client.chat([{'role': 'user', 'content': 'hi'}], temperature=0.3, max_tokens=10)
+        
+        assert response['content'] == 'mock answer'
+        assert response['total_tokens'] == 5
+        path, body = server.requests[-1]
+        assert path == '/v1/chat/completions'
+        assert body['model'] == 'mock-gpt'
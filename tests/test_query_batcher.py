@@ -0,0 +1,159 @@
+import gc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from query_batcher import QueryBatcher, get_query_batcher
+import query_batcher
+
+
+class StubGenerator:
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+    
+    def generate_embeddings_batch(self, texts, show_progress_bar=True):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype='float32')
+
+
+class StubStore:
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.calls = []
+    
+    def search_batch(self, query_embeddings, top_k=None):
+        self.calls.append(len(query_embeddings))
+        if self.error is not None:
+            raise self.error
+        return [[('hit', float(row[0]), top_k)] for row in query_embeddings]
+
+
+def run_concurrently(fn, args):
+    with ThreadPoolExecutor(max_workers=len(args)) as pool:
+        return list(pool.map(fn, args))
+
+
+def test_concurrent_queries_share_one_batch():
+    generator = StubGenerator()
+    batcher = QueryBatcher(generator, max_batch_size=4, max_wait_ms=500)
+    
+    embeddings = run_concurrently(batcher.embed, ['a', 'bb', 'ccc', 'dddd'])
+    
+    assert [embedding[0] for embedding in embeddings] == [1.0, 2.0, 3.0, 4.0]
+    assert len(generator.calls) == 1
+    assert sorted(generator.calls[0]) == ['a', 'bb', 'ccc', 'dddd']
+    assert batcher.get_stats()['batches'] == 1
+
+
+def test_embed_and_search_runs_one_search_per_store():
+    generator = StubGenerator()
+    store = StubStore()
+    batcher = QueryBatcher(generator, max_batch_size=3, max_wait_ms=500)
+    
+    results = run_concurrently(lambda text: batcher.embed_and_search(text, store, 2), ['a', 'bb', 'ccc'])
+    
+    assert store.calls == [3]
+    for text, (embedding, hits) in zip(['a', 'bb', 'ccc'], results):
+        assert embedding[0] == len(text)
+        assert hits == [('hit', float(len(text)), 2)]
+
+
+def test_identical_in_flight_queries_are_shared():
+    generator = StubGenerator(delay=0.2)
+    batcher = QueryBatcher(generator, max_batch_size=32, max_wait_ms=50)
+    
+    embeddings = run_concurrently(batcher.embed, ['same'] * 4)
+    
+    assert all(embedding[0] == 4.0 for embedding in embeddings)
+    assert generator.calls == [['same']]
+    stats = batcher.get_stats()
+    assert stats['requests'] == 4
+    assert stats['shared'] == 3
+
+
+def test_result_wait_is_bounded_by_timeout():
+    generator = StubGenerator(delay=1.0)
+    batcher = QueryBatcher(generator, max_wait_ms=0, timeout=0.1)
+    
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        batcher.embed('slow')
+    assert time.monotonic() - started < 0.5
+
+
+def test_embedding_errors_are_routed_to_every_waiter():
+    generator = StubGenerator(error=ValueError('boom'))
+    batcher = QueryBatcher(generator, max_batch_size=2, max_wait_ms=500)
+    
+    def embed(text):
+        try:
+            batcher.embed(text)
+        except ValueError as e:
+            return str(e)
+    
+    assert run_concurrently(embed, ['a', 'b']) == ['boom', 'boom']
+
+
+def test_search_errors_are_routed_to_waiters():
+    generator = StubGenerator()
+    batcher = QueryBatcher(generator, max_wait_ms=0)
+    
+    with pytest.raises(RuntimeError, match='index gone'):
+        batcher.embed_and_search('a', StubStore(error=RuntimeError('index gone')))
+
+
+def test_dispatcher_survives_unexpected_errors():
+    generator = StubGenerator()
+    generator.generate_embeddings_batch = lambda texts, show_progress_bar=True: []
+    batcher = QueryBatcher(generator, max_wait_ms=0)
+    
+    with pytest.raises(IndexError):
+        batcher.embed('a')
+    
+    generator.generate_embeddings_batch = StubGenerator().generate_embeddings_batch
+    assert batcher.embed('bb')[0] == 2.0
+
+
+def test_batcher_is_registered_per_generator_and_stops_with_it():
+    generator = StubGenerator()
+    batcher = get_query_batcher(generator)
+    
+    assert get_query_batcher(generator) is batcher
+    assert not hasattr(generator, 'query_batcher')
+    assert batcher.embed('a')[0] == 1.0
+    
+    del generator
+    gc.collect()
+    batcher.thread.join(timeout=2)
+    
+    assert len(query_batcher._batchers) == 0
+    assert not batcher.thread.is_alive()
+    with pytest.raises(RuntimeError, match='no longer available'):
+        batcher.embed('a')
+
+
+def test_queued_queries_fail_when_generator_is_collected():
+    generator = StubGenerator()
+    batcher = QueryBatcher(generator, max_wait_ms=0, timeout=5)
+    release = threading.Event()
+    generator.generate_embeddings_batch = lambda texts, show_progress_bar=True: release.wait() and np.ones((len(texts), 2))
+    
+    first = batcher._submit(('first', None, None))
+    time.sleep(0.05)
+    queued = batcher._submit(('queued', None, None))
+    del generator
+    gc.collect()
+    release.set()
+    
+    assert first.result(timeout=1)[0] == 1.0
+    with pytest.raises(RuntimeError, match='no longer available'):
+        queued.result(timeout=1)
@@ -0,0 +1,88 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('faiss')
+
+from config import Config
+from vector_store import VectorStore
+
+
+def chunk(text: str, value: float) -> dict:
+    return {
+        'text': text,
+        'technique': 'semantic',
+        'metadata': {'filename': 'doc.txt', 'source': 'doc.txt'},
+        'embedding': np.full(4, value, dtype='float32')
+    }
+
+
+def texts(store: VectorStore) -> list:
+    return sorted(record.text for record in store.chunks)
+
+
+def open_store(path, build: str) -> VectorStore:
+    store = VectorStore(str(path), build)
+    store.load()
+    return store
+
+
+@pytest.fixture
+def build(tmp_path):
+    store = VectorStore(str(tmp_path), 'b1')
+    store.add_chunks([chunk('t0', 0.0)])
+    store.save()
+    store.release()
+    return tmp_path
+
+
+def test_interleaved_appends_from_two_instances_are_kept(build):
+    a = open_store(build, 'b1')
+    b = open_store(build, 'b1')
+    
+    a.add_chunks([chunk('t1', 1.0)])
+    a.save()
+    b.add_chunks([chunk('t2', 2.0)])
+    b.save()
+    
+    assert texts(open_store(build, 'b1')) == ['t0', 't1', 't2']
+
+
+def test_compaction_keeps_segments_written_by_other_instances(build, monkeypatch):
+    monkeypatch.setattr(Config, 'SEGMENT_COMPACTION_THRESHOLD', 100)
+    a = open_store(build, 'b1')
+    b = open_store(build, 'b1')
+    
+    for i in range(1, 4):
+        a.add_chunks([chunk(f'a{i}', float(i))])
+        a.save()
+        b.add_chunks([chunk(f'b{i}', float(-i))])
+        b.save()
+    
+    a.compact()
+    
+    reloaded = open_store(build, 'b1')
+    assert len(reloaded.segments) == 1
+    assert texts(reloaded) == ['a1', 'a2', 'a3', 'b1', 'b2', 'b3', 't0']
+    assert reloaded.index.ntotal == 7
+    
+    b.add_chunks([chunk('b4', -4.0)])
+    b.save()
+    assert texts(open_store(build, 'b1')) == ['a1', 'a2', 'a3', 'b1', 'b2', 'b3', 'b4', 't0']
+
+
+def test_reset_replaces_everything_on_disk(build):
+    a = open_store(build, 'b1')
+    a.reset()
+    a.add_chunks([chunk('fresh', 5.0)])
+    a.save()
+    
+    assert texts(open_store(build, 'b1')) == ['fresh']
+
+
+def test_add_chunks_returns_records_added(tmp_path):
+    store = VectorStore(str(tmp_path), 'b1')
+    
+    assert store.add_chunks([chunk('t0', 0.0), chunk('t0', 0.0), chunk('t1', 1.0)]) == 2
+    assert store.add_chunks([chunk('t0', 0.0)]) == 0
+    assert store.add_chunks([]) == 0
+    assert len(store.chunks) == 2
@@ -1,83 +1,415 @@
 import os
+import json
 import pickle
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
 import numpy as np
 import faiss
 from typing import List, Dict
+from chunk_record import ChunkRecord, SearchResult
 from config import Config
 
+try:
+    import fcntl
+except:
+    fcntl = None
+
+def _fsync_dir(path: str):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(path))
+
+def new_build_id() -> str:
+    return datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+
+def _lease_is_live(lease_name: str) -> bool:
+    try:
+        pid = int(lease_name.split('-')[1])
+    except (IndexError, ValueError):
+        return True
+    if pid == os.getpid() or os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def build_in_use(build_path: str) -> bool:
+    if not os.path.isdir(build_path):
+        return False
+    return any(entry.startswith('.lease-') and _lease_is_live(entry) for entry in os.listdir(build_path))
+
+def read_current_build(store_path: str):
+    current_path = os.path.join(store_path, 'CURRENT')
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path, 'r') as f:
+        return f.read().strip() or None
+
 class VectorStore:
-    def __init__(self):
-        self.store_path = Config.VECTOR_DB_PATH
+    def __init__(self, store_path: str = None, build: str = None):
+        self.store_path = store_path or Config.VECTOR_DB_PATH
+        self.build = build or read_current_build(self.store_path)
+        if self.build:
+            self.data_path = os.path.join(self.store_path, 'builds', self.build)
+        else:
+            self.data_path = self.store_path
         self.index = None
         self.chunks = []
         self.dimension = None
+        self.version = 0
+        self.segments = []
+        self.persisted_count = 0
+        self.replace_on_save = False
+        self.compacting = False
+        self.chunk_keys = {}
+        self.duplicates_collapsed = 0
+        self.record_bytes = 0
+        self.lock = threading.RLock()
+        
+        if not os.path.exists(self.data_path):
+            os.makedirs(self.data_path)
         
-        if not os.path.exists(self.store_path):
-            os.makedirs(self.store_path)
+        self.lease_path = None
+        if self.build:
+            self.lease_path = os.path.join(self.data_path, f'.lease-{os.getpid()}-{id(self)}')
+            with open(self.lease_path, 'w'):
+                pass
+    
+    def release(self):
+        if self.lease_path and os.path.exists(self.lease_path):
+            os.remove(self.lease_path)
+        self.lease_path = None
+    
+    def _check_writable(self):
+        if not os.path.isdir(self.data_path):
+            raise RuntimeError(f"Build {self.build} no longer exists; reload the collection before writing to it")
     
     def create_index(self, dimension: int):
         self.dimension = dimension
         self.index = faiss.IndexFlatL2(dimension)
     
-    def add_chunks(self, chunks: List[Dict]):
+    def _chunk_key(self, record: ChunkRecord):
+        return (record.filename, record.embedded_text)
+    
+    def _to_records(self, chunks: List) -> List[ChunkRecord]:
+        return [chunk if isinstance(chunk, ChunkRecord) else ChunkRecord.from_dict(chunk) for chunk in chunks]
+    
+    def _rebuild_record_state(self):
+        self.chunk_keys = {self._chunk_key(chunk): i for i, chunk in enumerate(self.chunks)}
+        self.record_bytes = sum(record.nbytes() for record in self.chunks)
+    
+    def add_chunks(self, chunks: List[Dict]) -> int:
         if not chunks:
-            return
-        
-        embeddings = np.array([chunk['embedding'] for chunk in chunks])
-        
-        if self.index is None:
-            self.create_index(embeddings.shape[1])
+            return 0
         
-        self.index.add(embeddings.astype('float32'))
-        self.chunks.extend(chunks)
+        with self.lock:
+            unique = []
+            embeddings = []
+            batch = {}
+            for chunk in chunks:
+                record = ChunkRecord.from_dict(chunk)
+                key = self._chunk_key(record)
+                if key in self.chunk_keys:
+                    self.duplicates_collapsed += 1
+                elif key in batch:
+                    batch[key].merge(chunk)
+                    self.duplicates_collapsed += 1
+                else:
+                    batch[key] = record
+                    unique.append(record)
+                    embeddings.append(chunk['embedding'])
+            
+            if not unique:
+                return 0
+            
+            embeddings = np.array(embeddings)
+            
+            if self.index is None:
+                self.create_index(embeddings.shape[1])
+            
+            start = len(self.chunks)
+            self.index.add(embeddings.astype('float32'))
+            self.chunks.extend(unique)
+            self.record_bytes += sum(record.nbytes() for record in unique)
+            for offset, chunk in enumerate(unique):
+                self.chunk_keys[self._chunk_key(chunk)] = start + offset
+            self.version += 1
+            return len(unique)
     
-    def search(self, query_embedding: np.ndarray, top_k: int = None) -> List[Dict]:
-        if self.index is None or len(self.chunks) == 0:
-            return []
+    def reset(self):
+        with self.lock:
+            self.index = None
+            self.chunks = []
+            self.record_bytes = 0
+            self.chunk_keys = {}
+            self.dimension = None
+            self.persisted_count = 0
+            self.replace_on_save = True
+            self.version += 1
+    
+    def search(self, query_embedding: np.ndarray, top_k: int = None) -> List[SearchResult]:
+        return self.search_batch(query_embedding.reshape(1, -1), top_k)[0]
+    
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int = None) -> List[List[SearchResult]]:
+        index = self.index
+        chunks = self.chunks
+        if index is None or len(chunks) == 0:
+            return [[] for _ in range(len(query_embeddings))]
         
         if top_k is None:
             top_k = Config.TOP_K
         
-        query_vector = query_embedding.reshape(1, -1).astype('float32')
-        distances, indices = self.index.search(query_vector, min(top_k, len(self.chunks)))
+        query_vectors = np.ascontiguousarray(query_embeddings, dtype='float32')
+        distances, indices = index.search(query_vectors, min(top_k, len(chunks)))
         
         results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx < len(self.chunks):
-                chunk = self.chunks[idx].copy()
-                chunk['similarity_score'] = float(1 / (1 + distance))
-                chunk['distance'] = float(distance)
-                results.append(chunk)
+        for row_indices, row_distances in zip(indices, distances):
+            results.append([
+                SearchResult(chunks[idx], float(distance))
+                for idx, distance in zip(row_indices, row_distances)
+                if 0 <= idx < len(chunks)
+            ])
         
         return results
     
+    def _segments_dir(self, filename: str) -> str:
+        return os.path.join(self.data_path, f'{filename}.segments')
+    
+    def _manifest_path(self, filename: str) -> str:
+        return os.path.join(self.data_path, f'{filename}.manifest.json')
+    
+    @contextmanager
+    def _file_lock(self, filename: str, exclusive: bool = True):
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(os.path.join(self.data_path, f'{filename}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+    
+    def _read_manifest(self, filename: str):
+        path = self._manifest_path(filename)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+    
+    def _new_segment_name(self) -> str:
+        return f'{os.getpid()}-{uuid.uuid4().hex}.seg'
+    
+    def _write_segment_file(self, filename: str, name: str, data: Dict):
+        self._check_writable()
+        segments_dir = self._segments_dir(filename)
+        if not os.path.exists(segments_dir):
+            os.makedirs(segments_dir)
+        _write_atomic(os.path.join(segments_dir, name), pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    
+    def _write_segment(self, filename: str, start: int, end: int) -> Dict:
+        name = self._new_segment_name()
+        data = {'vectors': self.index.reconstruct_n(start, end - start), 'chunks': self.chunks[start:end]}
+        self._write_segment_file(filename, name, data)
+        return {'name': name, 'count': end - start}
+    
+    def _write_manifest(self, filename: str, segments: List[Dict], dimension: int = None):
+        manifest = {
+            'dimension': dimension if dimension is not None else self.dimension,
+            'segments': segments
+        }
+        _write_atomic(self._manifest_path(filename), json.dumps(manifest).encode('utf-8'))
+    
+    def _remove_segments(self, filename: str, segments: List[Dict]):
+        for segment in segments:
+            path = os.path.join(self._segments_dir(filename), segment['name'])
+            if os.path.exists(path):
+                os.remove(path)
+    
     def save(self, filename: str = 'vector_store'):
-        index_path = os.path.join(self.store_path, f'{filename}.faiss')
-        chunks_path = os.path.join(self.store_path, f'{filename}.pkl')
+        with self.lock:
+            total = len(self.chunks)
+            
+            with self._file_lock(filename):
+                manifest = self._read_manifest(filename)
+                on_disk = manifest['segments'] if manifest else []
+                
+                if self.replace_on_save:
+                    self.segments = [self._write_segment(filename, 0, total)] if total else []
+                    self._write_manifest(filename, self.segments)
+                    self._remove_segments(filename, on_disk)
+                    
+                    for legacy_path in (os.path.join(self.data_path, f'{filename}.faiss'),
+                                        os.path.join(self.data_path, f'{filename}.pkl')):
+                        if os.path.exists(legacy_path):
+                            os.remove(legacy_path)
+                    
+                    self.replace_on_save = False
+                elif total > self.persisted_count:
+                    self.segments = on_disk + [self._write_segment(filename, self.persisted_count, total)]
+                    self._write_manifest(filename, self.segments)
+                else:
+                    self.segments = on_disk
+            
+            self.persisted_count = total
+            
+            if len(self.segments) > Config.SEGMENT_COMPACTION_THRESHOLD and not self.compacting:
+                self.compacting = True
+                threading.Thread(target=self.compact, args=(filename,), daemon=True).start()
+    
+    def compact(self, filename: str = 'vector_store'):
+        try:
+            with self._file_lock(filename):
+                manifest = self._read_manifest(filename)
+                if manifest is None or len(manifest['segments']) < 2:
+                    return
+                merged = manifest['segments']
+                vectors, chunks = self._read_segments(filename, merged)
+                
+                name = self._new_segment_name()
+                self._write_segment_file(filename, name, {'vectors': np.vstack(vectors), 'chunks': chunks})
+                segments = [{'name': name, 'count': len(chunks)}]
+                self._write_manifest(filename, segments, manifest['dimension'])
+                self._remove_segments(filename, merged)
+            
+            with self.lock:
+                self.segments = segments
+            print(f"Compacted {len(merged)} segments into {name}")
+        except Exception as e:
+            print(f"Segment compaction failed: {e}")
+        finally:
+            self.compacting = False
+    
+    def _read_segments(self, filename: str, segments: List[Dict]):
+        vectors = []
+        chunks = []
+        for segment in segments:
+            with open(os.path.join(self._segments_dir(filename), segment['name']), 'rb') as f:
+                data = pickle.load(f)
+            vectors.append(data['vectors'])
+            chunks.extend(self._to_records(data['chunks']))
+        return vectors, chunks
+    
+    def _load_segments(self, filename: str):
+        with self._file_lock(filename, exclusive=False):
+            manifest = self._read_manifest(filename)
+            vectors, chunks = self._read_segments(filename, manifest['segments'])
         
-        if self.index is not None:
-            faiss.write_index(self.index, index_path)
+        self.index = None
+        self.dimension = manifest['dimension']
+        if self.dimension is not None:
+            self.create_index(self.dimension)
+            if vectors:
+                self.index.add(np.vstack(vectors).astype('float32'))
         
-        with open(chunks_path, 'wb') as f:
-            pickle.dump(self.chunks, f)
+        self.chunks = chunks
+        self.segments = manifest['segments']
+        self.persisted_count = len(chunks)
+        self.replace_on_save = False
     
     def load(self, filename: str = 'vector_store'):
-        index_path = os.path.join(self.store_path, f'{filename}.faiss')
-        chunks_path = os.path.join(self.store_path, f'{filename}.pkl')
+        with self.lock:
+            if os.path.exists(self._manifest_path(filename)):
+                self._load_segments(filename)
+                self._rebuild_record_state()
+                self.version += 1
+                return
+            
+            index_path = os.path.join(self.data_path, f'{filename}.faiss')
+            chunks_path = os.path.join(self.data_path, f'{filename}.pkl')
+            
+            if os.path.exists(index_path):
+                self.index = faiss.read_index(index_path)
+                self.dimension = self.index.d
+            
+            if os.path.exists(chunks_path):
+                with open(chunks_path, 'rb') as f:
+                    self.chunks = self._to_records(pickle.load(f))
+            
+            self.replace_on_save = os.path.exists(index_path) or os.path.exists(chunks_path)
+            self.persisted_count = len(self.chunks)
+            self._rebuild_record_state()
+            self.version += 1
+    
+    def write_metadata(self, name: str, data: Dict):
+        self._check_writable()
+        _write_atomic(os.path.join(self.data_path, f'{name}.json'), json.dumps(data).encode('utf-8'))
+    
+    def read_metadata(self, name: str) -> Dict:
+        path = os.path.join(self.data_path, f'{name}.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+    
+    def publish(self, keep_builds: int = None):
+        if not self.build:
+            return
+        
+        published_path = os.path.join(self.store_path, 'PUBLISHED.json')
+        published = []
+        if os.path.exists(published_path):
+            with open(published_path, 'r') as f:
+                published = json.load(f)
+        if self.build not in published:
+            published.append(self.build)
+        
+        _write_atomic(published_path, json.dumps(published).encode('utf-8'))
+        _write_atomic(os.path.join(self.store_path, 'CURRENT'), self.build.encode('utf-8'))
         
-        if os.path.exists(index_path):
-            self.index = faiss.read_index(index_path)
+        if keep_builds is None:
+            keep_builds = Config.KEEP_BUILDS
+        keep_builds = max(1, keep_builds)
         
-        if os.path.exists(chunks_path):
-            with open(chunks_path, 'rb') as f:
-                self.chunks = pickle.load(f)
-                if self.chunks and 'embedding' in self.chunks[0]:
-                    self.dimension = len(self.chunks[0]['embedding'])
+        builds_path = os.path.join(self.store_path, 'builds')
+        retained = published[-keep_builds:]
+        for stale in published[:-keep_builds]:
+            stale_path = os.path.join(builds_path, stale)
+            if stale == self.build or build_in_use(stale_path):
+                retained.insert(0, stale)
+                continue
+            shutil.rmtree(stale_path, ignore_errors=True)
+        
+        if retained != published:
+            _write_atomic(published_path, json.dumps(sorted(retained, key=published.index)).encode('utf-8'))
+    
+    def memory_usage(self) -> int:
+        total = self.record_bytes
+        index = self.index
+        if index is not None:
+            total += index.ntotal * index.d * 4
+        return total
     
     def get_stats(self) -> Dict:
         return {
             'total_chunks': len(self.chunks),
             'dimension': self.dimension,
-            'indexed': self.index is not None
+            'indexed': self.index is not None,
+            'build': self.build,
+            'segments': len(self.segments),
+            'duplicates_collapsed': self.duplicates_collapsed
         }
 